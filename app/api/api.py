@@ -1,8 +1,9 @@
 from fastapi import APIRouter
 
 from app.api.endpoints import auth, users, posts, comments
+from app.core.responses import ORJSONResponse
 
-api_router = APIRouter()
+api_router = APIRouter(default_response_class=ORJSONResponse)
 
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
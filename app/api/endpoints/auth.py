@@ -1,22 +1,23 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.asynchronous.database import AsyncDatabase
 
 from app.core.deps import get_database, get_current_user
 from app.core.security import create_access_token
 from app.core.config import get_token_expire_time
+from app.core.responses import ORJSONResponse
 from app.crud.user import authenticate_user, create_user, change_user_password
 from app.models.auth import Token
 from app.models.user import User, UserCreate
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.post("/register", response_model=User, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: Annotated[UserCreate, Body(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     return await create_user(db, user_data)
 
@@ -24,7 +25,7 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
@@ -71,7 +72,7 @@ async def change_password(
     current_password: Annotated[str, Body(...)],
     new_password: Annotated[str, Body(...)],
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     success = await change_user_password(
         db, 
@@ -1,30 +1,60 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Path, status, Body
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Body
+from pymongo.asynchronous.database import AsyncDatabase
 
-from app.core.deps import get_database, get_current_user, get_current_admin_user
+from app.core.cache import (
+    COMMENT_KEY, COMMENT_REPLIES_KEY, cache_enabled, cached, invalidate_comments
+)
+from app.core.deps import CommentId, get_database, get_current_user, get_current_admin_user
+from app.core.etag import cache_headers, etag_response
+from app.core.tasks import run_in_background
+from app.core.responses import ORJSONResponse, PydanticResponse
 from app.crud.comment import (
     get_comment_by_id, create_comment, update_comment, 
-    delete_comment, get_comment_replies
+    delete_one_comment, delete_descendants, get_comment_with_replies, get_comment_lineage_ids
 )
-from app.models.comment import Comment, CommentCreate, CommentUpdate, CommentWithReplies
+from app.models.comment import Comment, CommentAuthor, CommentCreate, CommentUpdate, CommentWithReplies
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
 
-router = APIRouter()
+async def delete_replies(db: AsyncDatabase, comment: dict, lineage_ids: list) -> None:
+    await delete_descendants(db, comment)
+    # Кэш сбрасывается после удаления ответов, чтобы в него не попали удаляемые данные
+    await invalidate_comments(lineage_ids)
+
+
+def construct_comment(comment: dict) -> Comment:
+    # Данные уже проверены при записи в базу, поэтому модель собирается без валидации
+    return Comment.model_construct(
+        **{**comment, "author": CommentAuthor.model_construct(**comment["author"])}
+    )
 
 
 @router.post("", response_model=Comment, status_code=status.HTTP_201_CREATED)
 async def create_comment_route(
     comment_data: Annotated[CommentCreate, Body(...)],
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    return await create_comment(db, comment_data, current_user["id"])
+    comment = await create_comment(db, comment_data, current_user["id"])
+    
+    # Новый ответ меняет закэшированные деревья ответов всех предков
+    if cache_enabled():
+        await invalidate_comments(await get_comment_lineage_ids(db, comment["id"]))
+    
+    return await PydanticResponse.create(
+        construct_comment(comment),
+        status_code=status.HTTP_201_CREATED
+    )
 
 
-@router.get("/{comment_id}", response_model=Comment)
+@router.get("/{comment_id}", responses={200: {"model": Comment}})
+@cached(COMMENT_KEY)
 async def get_comment_route(
-    comment_id: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    comment_id: CommentId,
+    request: Request,
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     comment = await get_comment_by_id(db, comment_id)
     if not comment:
@@ -32,79 +62,90 @@ async def get_comment_route(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment with ID {comment_id} not found"
         )
-    return comment
+    
+    headers = cache_headers(comment)
+    not_modified = etag_response(request, headers)
+    if not_modified:
+        return not_modified
+    
+    return ORJSONResponse(comment, headers=headers)
 
 
-@router.get("/{comment_id}/replies", response_model=CommentWithReplies)
+@router.get("/{comment_id}/replies", responses={200: {"model": CommentWithReplies}})
+@cached(COMMENT_REPLIES_KEY)
 async def get_comment_with_replies_route(
-    comment_id: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    comment_id: CommentId,
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    comment = await get_comment_by_id(db, comment_id)
-    if not comment:
+    result = await get_comment_with_replies(db, comment_id)
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment with ID {comment_id} not found"
         )
     
-    replies = await get_comment_replies(db, comment_id)
-    
-    result = {**comment, "replies": replies}
-    return result
+    # Дерево ответов может быть большим, поэтому сериализуется вне event loop
+    return await ORJSONResponse.create(result)
 
 
 @router.put("/{comment_id}", response_model=Comment)
 async def update_comment_route(
-    comment_id: Annotated[str, Path(...)],
+    comment_id: CommentId,
     comment_data: Annotated[CommentUpdate, Body(...)],
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    comment = await get_comment_by_id(db, comment_id)
-    if not comment:
+    is_admin = current_user.get("role") == "admin"
+    
+    # Существование и авторство проверяются в update_comment в фильтре обновления
+    updated_comment = await update_comment(
+        db,
+        comment_id,
+        comment_data,
+        current_user["id"] if not is_admin else None
+    )
+    if not updated_comment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Comment with ID {comment_id} not found"
         )
     
-    if comment.get("author", {}).get("id") != current_user["id"] and current_user.get("role") != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You do not have permission to update this comment"
-        )
-    
-    updated_comment = await update_comment(db, comment_id, comment_data, current_user["id"])
+    if cache_enabled():
+        await invalidate_comments(await get_comment_lineage_ids(db, comment_id))
     
-    return updated_comment
+    return await PydanticResponse.create(construct_comment(updated_comment))
 
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_comment_route(
-    comment_id: Annotated[str, Path(...)],
+    request: Request,
+    comment_id: CommentId,
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    comment = await get_comment_by_id(db, comment_id)
-    if not comment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Comment with ID {comment_id} not found"
-        )
-    
-    is_author = comment.get("author", {}).get("id") == current_user["id"]
     is_admin = current_user.get("role") == "admin"
     
-    success = await delete_comment(
+    # Список затронутых комментариев нужно получить до удаления
+    lineage_ids = []
+    if cache_enabled():
+        lineage_ids = await get_comment_lineage_ids(db, comment_id, include_descendants=True)
+    
+    comment = await delete_one_comment(
         db, 
         comment_id, 
         current_user["id"] if not is_admin else None,
         is_admin
     )
     
-    if not success:
+    # Авторство проверяется в delete_one_comment, None означает, что комментария нет
+    if not comment:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete comment"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Comment with ID {comment_id} not found"
         )
     
+    await invalidate_comments(lineage_ids)
+    # Ответы удаляются после отправки 204, клиент ждет только удаления самого комментария
+    run_in_background(request, delete_replies(db, comment, lineage_ids), f"delete-replies-{comment_id}")
+    
     return None 
\ No newline at end of file
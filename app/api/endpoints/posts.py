@@ -1,52 +1,67 @@
+import asyncio
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status, Body
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status, Body
+from pymongo.asynchronous.database import AsyncDatabase
 
+from app.core.cache import cache_enabled, invalidate_comments
 from app.core.deps import (
-    get_database, get_current_user, get_current_editor_or_admin_user,
+    PostId, get_database, get_current_user, get_current_editor_or_admin_user,
     pagination_params, post_filter_params
 )
+from app.core.etag import cache_headers, etag_response
+from app.core.responses import ORJSONResponse, stream_json_page
 from app.crud.post import (
-    get_post_by_id, get_post_by_slug, get_posts, get_posts_count,
+    get_post_by_id, get_post_by_slug, iter_posts, get_posts_count, post_exists,
     create_post, update_post, delete_post
 )
-from app.crud.comment import get_comments_by_post, get_comments_count_by_post
+from app.crud.comment import (
+    get_post_comments_page, get_comment_ids_by_post
+)
 from app.models.post import Post, PostCreate, PostUpdate, PostList
-from app.models.comment import CommentList
+from app.models.comment import CommentWithRepliesList
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
-@router.post("", response_model=Post, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=None,
+    status_code=status.HTTP_201_CREATED,
+    responses={201: {"model": Post}}
+)
 async def create_post_route(
     post_data: Annotated[PostCreate, Body(...)],
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    return await create_post(db, post_data, current_user["id"])
+    post = await create_post(db, post_data, current_user["id"])
+    
+    # Пост собран из уже проверенных данных, поэтому сериализуется orjson без модели ответа
+    return await ORJSONResponse.create(post, status_code=status.HTTP_201_CREATED)
 
 
-@router.get("", response_model=PostList)
+@router.get("", response_model=None, responses={200: {"model": PostList}})
 async def get_posts_route(
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    db: Annotated[AsyncDatabase, Depends(get_database)],
     pagination: Annotated[dict, Depends(pagination_params)],
     filters: Annotated[dict, Depends(post_filter_params)]
 ):
-    posts = await get_posts(db, pagination["limit"], pagination["offset"], filters)
-    total = await get_posts_count(db, filters)
-    
-    return {
-        "total": total,
-        "limit": pagination["limit"],
-        "offset": pagination["offset"],
-        "items": posts
-    }
+    # Посты собраны в форме ответа на стороне базы и отдаются по мере чтения курсора,
+    # общее количество считается параллельно отдельным запросом
+    return stream_json_page(
+        iter_posts(db, pagination["limit"], pagination["offset"], filters),
+        lambda: get_posts_count(db, filters),
+        pagination["limit"],
+        pagination["offset"]
+    )
 
 
 @router.get("/{post_id}", response_model=Post)
 async def get_post_by_id_route(
-    post_id: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    post_id: PostId,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     post = await get_post_by_id(db, post_id)
     if not post:
@@ -54,13 +69,22 @@ async def get_post_by_id_route(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Post with ID {post_id} not found"
         )
+    
+    headers = cache_headers(post)
+    not_modified = etag_response(request, headers)
+    if not_modified:
+        return not_modified
+    
+    response.headers.update(headers)
     return post
 
 
 @router.get("/slug/{slug}", response_model=Post)
 async def get_post_by_slug_route(
     slug: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     post = await get_post_by_slug(db, slug)
     if not post:
@@ -68,63 +92,53 @@ async def get_post_by_slug_route(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Post with slug '{slug}' not found"
         )
+    
+    headers = cache_headers(post)
+    not_modified = etag_response(request, headers)
+    if not_modified:
+        return not_modified
+    
+    response.headers.update(headers)
     return post
 
 
 @router.put("/{post_id}", response_model=Post)
 async def update_post_route(
-    post_id: Annotated[str, Path(...)],
+    post_id: PostId,
     post_data: Annotated[PostUpdate, Body(...)],
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    post = await get_post_by_id(db, post_id)
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post with ID {post_id} not found"
-        )
-    
-    is_author = post.get("author", {}).get("id") == current_user["id"]
     is_editor_or_admin = current_user.get("role") in ["editor", "admin"]
     
-    if not is_author and not is_editor_or_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You do not have permission to update this post"
-        )
-    
+    # Существование и авторство проверяются в update_post по полям поста без полной загрузки
     updated_post = await update_post(
         db, 
         post_id, 
         post_data, 
         current_user["id"] if not is_editor_or_admin else None
     )
+    if not updated_post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post with ID {post_id} not found"
+        )
     
     return updated_post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post_route(
-    post_id: Annotated[str, Path(...)],
+    post_id: PostId,
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    post = await get_post_by_id(db, post_id)
-    if not post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Post with ID {post_id} not found"
-        )
-    
-    is_author = post.get("author", {}).get("id") == current_user["id"]
     is_editor_or_admin = current_user.get("role") in ["editor", "admin"]
     
-    if not is_author and not is_editor_or_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You do not have permission to delete this post"
-        )
+    # Комментарии поста удаляются вместе с ним, их кэш тоже нужно сбросить
+    comment_ids = []
+    if cache_enabled():
+        comment_ids = await get_comment_ids_by_post(db, post_id)
     
     success = await delete_post(
         db, 
@@ -132,42 +146,46 @@ async def delete_post_route(
         current_user["id"] if not is_editor_or_admin else None
     )
     
+    # Авторство проверяется в delete_post, False означает, что поста нет
     if not success:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete post"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post with ID {post_id} not found"
         )
     
+    await invalidate_comments(comment_ids)
+    
     return None
 
 
-@router.get("/{post_id}/comments", response_model=CommentList)
+@router.get("/{post_id}/comments", response_model=None, responses={200: {"model": CommentWithRepliesList}})
 async def get_post_comments(
-    post_id: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    post_id: PostId,
+    db: Annotated[AsyncDatabase, Depends(get_database)],
     pagination: Annotated[dict, Depends(pagination_params)],
     include_replies: Annotated[bool, Query(False)] = False
 ):
-    post = await get_post_by_id(db, post_id)
-    if not post:
+    # Проверка существования поста идет параллельно с выборкой комментариев
+    exists, page = await asyncio.gather(
+        post_exists(db, post_id),
+        get_post_comments_page(
+            db, 
+            post_id, 
+            pagination["limit"], 
+            pagination["offset"], 
+            include_replies
+        )
+    )
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Post with ID {post_id} not found"
         )
     
-    comments = await get_comments_by_post(
-        db, 
-        post_id, 
-        pagination["limit"], 
-        pagination["offset"], 
-        include_replies
-    )
-    
-    total = await get_comments_count_by_post(db, post_id)
-    
-    return {
-        "total": total,
+    # Деревья ответов могут быть большими, поэтому сериализуются вне event loop
+    return await ORJSONResponse.create({
+        "total": page["total"],
         "limit": pagination["limit"],
         "offset": pagination["offset"],
-        "items": comments
-    } 
\ No newline at end of file
+        "items": page["items"]
+    }) 
\ No newline at end of file
@@ -1,18 +1,20 @@
 from typing import Annotated, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status, Body
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, Body
+from pymongo.asynchronous.database import AsyncDatabase
 
-from app.core.deps import get_database, get_current_user, get_current_admin_user, pagination_params
+from app.core.deps import UserId, get_database, get_current_user, get_current_admin_user, pagination_params
+from app.core.etag import cache_headers, etag_response
+from app.core.responses import ORJSONResponse, stream_json_list
 from app.crud.user import (
-    get_user_by_id, get_users, get_users_count, update_user, delete_user
+    get_user_by_id, get_user_with_stats, iter_users, update_user, delete_user
 )
-from app.crud.post import get_posts, get_posts_count
-from app.crud.comment import get_user_comments, get_user_comments_count
+from app.crud.post import get_posts_page
+from app.crud.comment import get_user_comments_page
 from app.models.user import User, UserUpdate, UserRole, UserWithStats, UserPublic
 from app.models.post import PostList
 from app.models.comment import CommentList
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.get("/me", response_model=User)
@@ -25,25 +27,22 @@ async def read_users_me(
 @router.get("/me/stats", response_model=UserWithStats)
 async def read_users_me_stats(
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    user_id = current_user["id"]
-    
-    posts_count = await get_posts_count(db, {"author_id": user_id})
-    comments_count = await get_user_comments_count(db, user_id)
-    
-    return {
-        **current_user,
-        "posts_count": posts_count,
-        "comments_count": comments_count
-    }
+    user = await get_user_with_stats(db, current_user["id"])
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
 
 @router.put("/me", response_model=User)
 async def update_user_me(
     user_data: Annotated[UserUpdate, Body(...)],
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     if hasattr(user_data, "role") and user_data.role is not None:
         raise HTTPException(
@@ -63,72 +62,70 @@ async def update_user_me(
 @router.get("/me/posts", response_model=PostList)
 async def read_users_me_posts(
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    db: Annotated[AsyncDatabase, Depends(get_database)],
     pagination: Annotated[dict, Depends(pagination_params)]
 ):
     user_id = current_user["id"]
     
-    posts = await get_posts(
+    page = await get_posts_page(
         db, 
         pagination["limit"], 
         pagination["offset"], 
         {"author_id": user_id}
     )
     
-    total = await get_posts_count(db, {"author_id": user_id})
-    
     return {
-        "total": total,
+        "total": page["total"],
         "limit": pagination["limit"],
         "offset": pagination["offset"],
-        "items": posts
+        "items": page["items"]
     }
 
 
 @router.get("/me/comments", response_model=CommentList)
 async def read_users_me_comments(
     current_user: Annotated[dict, Depends(get_current_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    db: Annotated[AsyncDatabase, Depends(get_database)],
     pagination: Annotated[dict, Depends(pagination_params)]
 ):
     user_id = current_user["id"]
     
-    comments = await get_user_comments(
+    page = await get_user_comments_page(
         db, 
         user_id, 
         pagination["limit"], 
         pagination["offset"]
     )
     
-    total = await get_user_comments_count(db, user_id)
-    
     return {
-        "total": total,
+        "total": page["total"],
         "limit": pagination["limit"],
         "offset": pagination["offset"],
-        "items": comments
+        "items": page["items"]
     }
 
 
-@router.get("", response_model=List[UserPublic])
+@router.get("", response_model=None, responses={200: {"model": List[UserPublic]}})
 async def read_users(
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)],
+    db: Annotated[AsyncDatabase, Depends(get_database)],
     pagination: Annotated[dict, Depends(pagination_params)],
     role: Annotated[Optional[UserRole], Query(None)] = None
 ):
-    users = await get_users(
+    # Пользователи сериализуются и отправляются по мере чтения курсора
+    return stream_json_list(iter_users(
         db, 
         pagination["offset"], 
         pagination["limit"], 
         role
-    )
-    return users
+    ))
 
 
 @router.get("/{user_id}", response_model=UserPublic)
 async def read_user(
-    user_id: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    user_id: UserId,
+    request: Request,
+    response: Response,
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     user = await get_user_by_id(db, user_id)
     if not user:
@@ -136,37 +133,36 @@ async def read_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with ID {user_id} not found"
         )
+    
+    headers = cache_headers(user)
+    not_modified = etag_response(request, headers)
+    if not_modified:
+        return not_modified
+    
+    response.headers.update(headers)
     return user
 
 
 @router.get("/{user_id}/stats", response_model=UserWithStats)
 async def read_user_stats(
-    user_id: Annotated[str, Path(...)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    user_id: UserId,
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    user = await get_user_by_id(db, user_id)
+    user = await get_user_with_stats(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with ID {user_id} not found"
         )
-    
-    posts_count = await get_posts_count(db, {"author_id": user_id})
-    comments_count = await get_user_comments_count(db, user_id)
-    
-    return {
-        **user,
-        "posts_count": posts_count,
-        "comments_count": comments_count
-    }
+    return user
 
 
 @router.put("/{user_id}", response_model=User)
 async def update_user_admin(
-    user_id: Annotated[str, Path(...)],
+    user_id: UserId,
     user_data: Annotated[UserUpdate, Body(...)],
     current_user: Annotated[dict, Depends(get_current_admin_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
     updated_user = await update_user(db, user_id, user_data)
     if not updated_user:
@@ -179,11 +175,11 @@ async def update_user_admin(
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user_admin(
-    user_id: Annotated[str, Path(...)],
+    user_id: UserId,
     current_user: Annotated[dict, Depends(get_current_admin_user)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ):
-    if current_user["id"] == user_id:
+    if current_user["id"] == str(user_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete yourself"
@@ -0,0 +1,92 @@
+import logging
+from functools import wraps
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from fastapi import Response, status
+from redis.exceptions import RedisError
+
+from app.core.config import get_settings
+from app.core.etag import CACHE_CONTROL, etag_response
+from app.db.redis import get_redis
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+COMMENT_KEY = "comment:{comment_id}"
+COMMENT_REPLIES_KEY = "comment:{comment_id}:replies"
+
+
+def cache_enabled() -> bool:
+    return get_redis() is not None
+
+
+def _pack(body: bytes, etag: Optional[str]) -> bytes:
+    # ETag хранится перед телом в той же записи, чтобы они не расходились
+    return f"{etag}\n".encode() + body if etag else body
+
+
+def _unpack(raw: bytes) -> Tuple[bytes, Optional[str]]:
+    # JSON-тело начинается с { или [, а ETag — с кавычки
+    if raw.startswith(b'"'):
+        etag, _, body = raw.partition(b"\n")
+        return body, etag.decode()
+    return raw, None
+
+
+def cached(key_template: str, ttl: int = settings.CACHE_TTL_SECONDS) -> Callable:
+    """Кэширование готового JSON-ответа GET-маршрута в Redis вместе с его ETag"""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Response:
+            redis = get_redis()
+            if redis is None:
+                return await func(*args, **kwargs)
+            
+            key = key_template.format(**kwargs)
+            try:
+                raw = await redis.get(key)
+            except RedisError:
+                logger.warning("Failed to read %s from cache", key, exc_info=True)
+                raw = None
+            
+            if raw is not None:
+                body, etag = _unpack(raw)
+                if etag is None:
+                    return Response(content=body, media_type="application/json")
+                
+                headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+                request = kwargs.get("request")
+                not_modified = etag_response(request, headers) if request else None
+                return not_modified or Response(content=body, media_type="application/json", headers=headers)
+            
+            response = await func(*args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                try:
+                    await redis.set(key, _pack(response.body, response.headers.get("etag")), ex=ttl)
+                except RedisError:
+                    logger.warning("Failed to write %s to cache", key, exc_info=True)
+            
+            return response
+        return wrapper
+    return decorator
+
+
+async def invalidate_comments(comment_ids: Iterable[str]) -> None:
+    """Удаление закэшированных комментариев и деревьев их ответов"""
+    redis = get_redis()
+    if redis is None:
+        return
+    
+    keys = []
+    for comment_id in comment_ids:
+        keys.append(COMMENT_KEY.format(comment_id=comment_id))
+        keys.append(COMMENT_REPLIES_KEY.format(comment_id=comment_id))
+    
+    if not keys:
+        return
+    
+    try:
+        await redis.delete(*keys)
+    except RedisError:
+        logger.warning("Failed to invalidate cached comments", exc_info=True)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from datetime import timedelta
 from functools import lru_cache
 
@@ -14,6 +14,22 @@ class Settings(BaseSettings):
     
     MONGODB_URL: str
     MONGODB_DB_NAME: str
+    MONGODB_MAX_POOL_SIZE: int = 200
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int = 300_000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 3000
+    MONGODB_COMPRESSORS: str = "zstd,zlib"
+    # Транзакции доступны только на replica set или sharded cluster
+    MONGODB_TRANSACTIONS: bool = False
+    
+    REDIS_URL: Optional[str] = None
+    REDIS_MAX_CONNECTIONS: int = 20
+    CACHE_TTL_SECONDS: int = 300
+    
+    # Кэш документов в памяти процесса
+    ENTITY_CACHE_TTL_SECONDS: int = 30
+    ENTITY_CACHE_MAXSIZE: int = 10_000
     
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
@@ -1,11 +1,16 @@
-from typing import Annotated, Dict
-from jose import JWTError, jwt
+import time
+from typing import Annotated, Any, Callable, Dict, Tuple
+import jwt
+from bson import ObjectId
+from cachetools import TLRUCache
+from jwt.exceptions import InvalidTokenError
 
-from fastapi import Depends, HTTPException, Query, status
+from fastapi import Depends, HTTPException, Path, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.asynchronous.database import AsyncDatabase
 
 from app.core.config import get_settings
+from app.core.security import JWT_SECRET, JWT_ALGORITHMS
 from app.db.mongodb import get_database
 from app.models.user import UserRole
 from app.crud.user import get_user_by_id
@@ -14,29 +19,54 @@ settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
+TOKEN_CACHE_TTL = 60
+
+
+def _token_expires_at(token: str, value: Tuple[str, Any], now: float) -> float:
+    # Токен хранится в кэше не дольше минуты и не дольше срока его действия
+    exp = value[1]
+    return min(now + TOKEN_CACHE_TTL, exp) if exp is not None else now + TOKEN_CACHE_TTL
+
+
+_jwt_cache = TLRUCache(maxsize=10_000, ttu=_token_expires_at, timer=time.time)
+
 
 async def get_current_user(
+    request: Request,
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+    db: Annotated[AsyncDatabase, Depends(get_database)]
 ) -> Dict:
+    # Пользователь уже определен в этом запросе (например, вызовом вне графа зависимостей FastAPI)
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    cached_token = _jwt_cache.get(token)
+    if cached_token is not None:
+        user_id = cached_token[0]
+    else:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=JWT_ALGORITHMS)
+            user_id: str = payload.get("sub")
+            if user_id is None:
+                raise credentials_exception
+        except InvalidTokenError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        
+        _jwt_cache[token] = (user_id, payload.get("exp"))
     
+    # Пользователь берется из кэша документов, который сбрасывается при изменении профиля
     user = await get_user_by_id(db, user_id)
     if user is None:
         raise credentials_exception
     
+    request.state.user = user
     return user
 
 
@@ -81,4 +111,22 @@ async def post_filter_params(
         filters["tags"] = tag
     if author_id:
         filters["author_id"] = author_id
-    return filters 
\ No newline at end of file
+    return filters 
+
+
+def object_id_path(name: str) -> Callable[[str], ObjectId]:
+    """Зависимость, разбирающая ObjectId из параметра пути до обращения к базе."""
+    def parse_oid(value: Annotated[str, Path(alias=name)]) -> ObjectId:
+        if not ObjectId.is_valid(value):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid ID: {value}"
+            )
+        return ObjectId(value)
+    
+    return parse_oid
+
+
+PostId = Annotated[ObjectId, Depends(object_id_path("post_id"))]
+CommentId = Annotated[ObjectId, Depends(object_id_path("comment_id"))]
+UserId = Annotated[ObjectId, Depends(object_id_path("user_id"))]
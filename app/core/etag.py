@@ -0,0 +1,40 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response, status
+
+from app.crud.serialize import AUTHOR_FIELDS
+
+CACHE_CONTROL = "private, max-age=10, must-revalidate"
+
+
+def document_etag(document: Dict[str, Any]) -> str:
+    """ETag документа по ID и времени изменения без сериализации тела."""
+    updated_at = document.get("updated_at")
+    version = updated_at.timestamp() if isinstance(updated_at, datetime) else updated_at
+    # Счетчик комментариев поста и встроенный профиль автора меняются без обновления updated_at
+    author = document.get("author") or {}
+    author_version = ":".join(str(author.get(field)) for field in AUTHOR_FIELDS)
+    raw = f"{document['id']}:{version}:{document.get('comments_count', '')}:{author_version}"
+    return f'"{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def cache_headers(document: Dict[str, Any]) -> Dict[str, str]:
+    return {"ETag": document_etag(document), "Cache-Control": CACHE_CONTROL}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def etag_response(request: Request, headers: Dict[str, str]) -> Optional[Response]:
+    """Ответ 304 без тела, если у клиента актуальная версия документа."""
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
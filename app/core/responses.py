@@ -0,0 +1,104 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Awaitable, Callable, Mapping, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse, ORJSONResponse as BaseORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+
+def orjson_default(obj: Any) -> Any:
+    """Сериализация типов, которые orjson не поддерживает сам"""
+    # datetime и Enum orjson сериализует нативно
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ThreadRenderMixin(ABC):
+    """Ответ, тело которого может сериализоваться в отдельном потоке"""
+
+    @staticmethod
+    @abstractmethod
+    def serialize(content: Any) -> bytes:
+        """Сериализация тела ответа; вызывается в том числе вне event loop"""
+
+    def render(self, content: Any) -> bytes:
+        # Уже сериализованное тело передается как есть
+        if isinstance(content, bytes):
+            return content
+        return self.serialize(content)
+
+    @classmethod
+    async def create(
+        cls,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None
+    ):
+        """Создание ответа с сериализацией в отдельном потоке, чтобы не блокировать event loop"""
+        body = await asyncio.to_thread(cls.serialize, content)
+        return cls(body, status_code=status_code, headers=headers)
+
+
+class ORJSONResponse(ThreadRenderMixin, BaseORJSONResponse):
+    """JSON-ответ через orjson с поддержкой документов MongoDB"""
+
+    @staticmethod
+    def serialize(content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class PydanticResponse(ThreadRenderMixin, JSONResponse):
+    """JSON-ответ, сериализуемый Rust-сериализатором Pydantic без повторной валидации"""
+
+    @staticmethod
+    def serialize(content: BaseModel) -> bytes:
+        return content.model_dump_json().encode()
+
+
+async def _json_array(items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    # Каждый документ сериализуется по мере получения из курсора
+    yield b"["
+    separator = b""
+    async for item in items:
+        yield separator + ORJSONResponse.serialize(item)
+        separator = b","
+    yield b"]"
+
+
+def stream_json_list(items: AsyncIterator[Any]) -> StreamingResponse:
+    """JSON-массив, отдаваемый клиенту по частям без сборки списка в памяти.
+
+    Статус 200 и заголовки уходят до чтения курсора: если курсор упадет на середине,
+    клиент получит обрезанное тело и разрыв соединения вместо ответа с ошибкой.
+    """
+    return StreamingResponse(_json_array(items), media_type="application/json")
+
+
+def stream_json_page(
+    items: AsyncIterator[Any],
+    count_total: Callable[[], Awaitable[int]],
+    limit: int,
+    offset: int
+) -> StreamingResponse:
+    """Страница в форме {limit, offset, items, total}; элементы отдаются по мере чтения курсора.
+
+    Подсчет запускается вызовом count_total только при начале отправки тела, поэтому
+    при отключении клиента до этого момента запрос в базу не выполняется. Ошибка
+    курсора или подсчета после первого фрагмента, как и в stream_json_list, приводит
+    к обрезанному телу при статусе 200.
+    """
+    async def body() -> AsyncIterator[bytes]:
+        # Подсчет выполняется параллельно с выдачей элементов, поэтому total идет последним
+        count = asyncio.ensure_future(count_total())
+        try:
+            yield b'{"limit":%d,"offset":%d,"items":' % (limit, offset)
+            async for chunk in _json_array(items):
+                yield chunk
+            yield b',"total":%d}' % await count
+        finally:
+            count.cancel()
+
+    return StreamingResponse(body(), media_type="application/json")
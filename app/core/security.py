@@ -1,7 +1,9 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 
-from jose import jwt, JWTError
+import jwt
+from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import HTTPException, status
@@ -11,18 +13,25 @@ from app.models.auth import TokenData
 from app.models.user import UserRole
 
 settings = get_settings()
+
+# Значения из настроек, нужные на каждый запрос, вычисляются один раз при импорте
+JWT_SECRET = settings.SECRET_KEY.encode()
+JWT_ALGORITHM = "HS256"
+JWT_ALGORITHMS = [JWT_ALGORITHM]
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля"""
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt занимает сотни миллисекунд CPU, поэтому в обработчиках он выполняется в пуле потоков
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверка пароля без блокировки event loop"""
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
-    """Хеширование пароля"""
-    return pwd_context.hash(password)
+async def get_password_hash_async(password: str) -> str:
+    """Хеширование пароля без блокировки event loop"""
+    return await asyncio.to_thread(pwd_context.hash, password)
 
 
 def create_access_token(
@@ -37,8 +46,8 @@ def create_access_token(
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(
         to_encode, 
-        settings.SECRET_KEY, 
-        algorithm="HS256"
+        JWT_SECRET, 
+        algorithm=JWT_ALGORITHM
     )
     return encoded_jwt
 
@@ -48,8 +57,8 @@ def decode_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(
             token, 
-            settings.SECRET_KEY, 
-            algorithms=["HS256"]
+            JWT_SECRET, 
+            algorithms=JWT_ALGORITHMS
         )
         
         user_id: str = payload.get("sub")
@@ -67,7 +76,7 @@ def decode_token(token: str) -> TokenData:
             role=payload.get("role")
         )
         
-    except JWTError:
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
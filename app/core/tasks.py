@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Any, Awaitable, Callable, Coroutine, Set
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+
+def _task_done(registry: Set[asyncio.Task], task: asyncio.Task) -> None:
+    registry.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task %s failed", task.get_name(), exc_info=task.exception())
+
+
+def run_in_background(request: Request, coro: Coroutine, name: str) -> asyncio.Task:
+    """Запуск задачи после ответа клиенту.
+
+    Ссылка на задачу хранится в app.state.background_tasks, чтобы сборщик мусора
+    не прервал ее до завершения; ошибки задачи пишутся в лог.
+    """
+    registry: Set[asyncio.Task] = request.app.state.background_tasks
+    task = asyncio.create_task(coro, name=name)
+    registry.add(task)
+    task.add_done_callback(partial(_task_done, registry))
+    return task
+
+
+async def wait_background_tasks(registry: Set[asyncio.Task]) -> None:
+    """Ожидание незавершенных задач перед закрытием соединений с базами."""
+    if registry:
+        await asyncio.gather(*registry, return_exceptions=True)
+
+
+async def repeat_every(interval: float, func: Callable[[], Awaitable[Any]], name: str) -> None:
+    """Периодический запуск func до отмены задачи; ошибка одного запуска не останавливает цикл."""
+    while True:
+        try:
+            await func()
+        except Exception:
+            logger.exception("Periodic task %s failed", name)
+        await asyncio.sleep(interval)
@@ -1,23 +1,44 @@
 import re
+from datetime import datetime
 from slugify import slugify
 
+SLUG_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789-")
+SLUG_PATTERN = re.compile(r"^[a-z0-9]+(?:-[a-z0-9]+)*$")
+
+
+def utc_now() -> datetime:
+    """Текущее время UTC с точностью до миллисекунд, как его хранит MongoDB.
+
+    Нужна там, где ответ собирается из записанного документа без повторного чтения.
+    """
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
 
 def generate_slug(text: str) -> str:
     return slugify(text)
 
 
 def is_valid_slug(slug: str) -> bool:
-    return bool(re.match(r"^[a-z0-9]+(?:-[a-z0-9]+)*$", slug))
+    if not slug or slug[0] == "-" or slug[-1] == "-":
+        return False
+    
+    # Быстрый путь для обычного slug: только допустимые символы без двойных дефисов
+    if "--" not in slug and SLUG_CHARS.issuperset(slug):
+        return True
+    
+    return SLUG_PATTERN.match(slug) is not None
 
 
 def get_summary_from_content(content: str, max_length: int = 200) -> str:
     if len(content) <= max_length:
         return content
     
-    summary = content[:max_length]
-    last_space = summary.rfind(' ')
+    # Ищем границу слова прямо в исходной строке, без промежуточного среза
+    last_space = content.rfind(' ', 0, max_length)
+    end = last_space if last_space != -1 else max_length
     
-    if last_space != -1:
-        summary = summary[:last_space]
+    while end and content[end - 1].isspace():
+        end -= 1
     
-    return summary.rstrip() + "..." 
\ No newline at end of file
+    return content[:end] + "..."
\ No newline at end of file
@@ -0,0 +1,19 @@
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo.asynchronous.collection import AsyncCollection
+
+
+def owned_filter(document_id: ObjectId, author_id: Optional[str] = None) -> Dict[str, Any]:
+    """Фильтр документа с условием авторства; без author_id (редактор, админ) — только по ID."""
+    query = {"_id": document_id}
+    if author_id:
+        query["author_id"] = ObjectId(author_id)
+    return query
+
+
+async def raise_if_forbidden(collection: AsyncCollection, document_id: ObjectId, detail: str) -> None:
+    """Разбор условной записи, не нашедшей документ: если он существует, значит, не хватает прав."""
+    if await collection.find_one({"_id": document_id}, projection={"_id": 1}) is not None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
@@ -1,167 +1,335 @@
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, Iterable, List, Dict, Any, Tuple, Union
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo import ReturnDocument
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.errors import DuplicateKeyError
 from fastapi import HTTPException, status
 
+from app.crud.access import owned_filter, raise_if_forbidden
+from app.crud.entity_cache import entity_cached, evict
+from app.crud.pagination import aggregate_page
+from app.crud.serialize import AUTHOR_PROJECTION, serialize_comment
+from app.crud.user import increment_user_counters
+from app.core.utils import utc_now
+from app.db.mongodb import transaction
 from app.models.comment import CommentCreate, CommentUpdate
 
 
-async def get_comment_by_id(db: AsyncIOMotorDatabase, comment_id: str) -> Optional[Dict[str, Any]]:
+# Время, после которого незавершенное каскадное удаление ответов считается брошенным
+COMMENT_DELETION_LEASE = timedelta(minutes=5)
+
+# Стадии агрегации для подстановки автора комментария вместо author_id
+AUTHOR_LOOKUP_STAGES: List[Dict[str, Any]] = [
+    {"$lookup": {
+        "from": "users",
+        "localField": "author_id",
+        "foreignField": "_id",
+        "pipeline": [{"$project": AUTHOR_PROJECTION}],
+        "as": "author"
+    }},
+    {"$unwind": {"path": "$author", "preserveNullAndEmptyArrays": True}},
+    {"$addFields": {
+        "id": {"$toString": "$_id"},
+        "post_id": {"$toString": "$post_id"},
+        "parent_id": {"$toString": "$parent_id"},
+        "author.id": {"$toString": "$author._id"}
+    }},
+    {"$project": {"_id": 0, "author_id": 0, "author._id": 0}}
+]
+
+# Стадии для комментариев пользователя: заголовок поста и автор
+USER_COMMENT_STAGES: List[Dict[str, Any]] = [
+    {"$lookup": {
+        "from": "posts",
+        "localField": "post_id",
+        "foreignField": "_id",
+        "pipeline": [{"$project": {"title": 1}}],
+        "as": "post"
+    }},
+    {"$addFields": {"post_title": {"$arrayElemAt": ["$post.title", 0]}}},
+    {"$project": {"post": 0}},
+    *AUTHOR_LOOKUP_STAGES
+]
+
+
+async def populate_comment(db: AsyncDatabase, comment: Dict[str, Any]) -> Dict[str, Any]:
+    """Подготовка документа комментария к выдаче в том же виде, что и AUTHOR_LOOKUP_STAGES."""
+    author = await db.users.find_one({"_id": comment["author_id"]}, projection=AUTHOR_PROJECTION)
+    return serialize_comment(comment, author)
+
+
+def _descendants_lookup(as_field: str) -> Dict[str, Any]:
+    """Стадия $graphLookup, собирающая всё дерево ответов на комментарий."""
+    return {"$graphLookup": {
+        "from": "comments",
+        "startWith": "$_id",
+        "connectFromField": "_id",
+        "connectToField": "parent_id",
+        "as": as_field
+    }}
+
+
+def _ancestors_lookup(as_field: str) -> Dict[str, Any]:
+    """Стадия $graphLookup, собирающая цепочку предков комментария."""
+    return {"$graphLookup": {
+        "from": "comments",
+        "startWith": "$parent_id",
+        "connectFromField": "parent_id",
+        "connectToField": "_id",
+        "as": as_field
+    }}
+
+
+async def _get_reply_trees(
+    db: AsyncDatabase,
+    root_ids: List[ObjectId]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Загрузка деревьев ответов для нескольких комментариев за один запрос."""
+    pipeline = [
+        {"$match": {"_id": {"$in": root_ids}}},
+        _descendants_lookup("descendants"),
+        {"$unwind": "$descendants"},
+        {"$replaceRoot": {"newRoot": "$descendants"}},
+        {"$sort": {"created_at": 1}},
+        *AUTHOR_LOOKUP_STAGES
+    ]
+    descendants = await (await db.comments.aggregate(pipeline)).to_list(length=None)
+    
+    return _group_replies(descendants)
+
+
+def _group_replies(comments: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Сборка дерева в памяти: группируем ответы по родителю."""
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment["parent_id"]].append(comment)
+    for comment in comments:
+        comment["replies"] = children.get(comment["id"], [])
+    
+    return children
+
+
+@entity_cached("comment")
+async def get_comment_by_id(db: AsyncDatabase, comment_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
     """Получение комментария по ID с информацией об авторе."""
     try:
-        comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
-        if not comment:
-            return None
-        
-        # Получение информации об авторе
-        author_id = comment.get("author_id")
-        if author_id:
-            author = await db.users.find_one({"_id": ObjectId(author_id)})
-            if author:
-                # Преобразуем _id автора в строку и удаляем пароль
-                author["id"] = str(author["_id"])
-                del author["_id"]
-                if "password" in author:
-                    del author["password"]
-                
-                # Оставляем только нужные поля для публичного профиля
-                comment["author"] = {
-                    "id": author["id"],
-                    "username": author.get("username"),
-                    "full_name": author.get("full_name"),
-                    "bio": author.get("bio")
-                }
-                
-                # Удаляем идентификатор автора, так как теперь у нас есть полные данные
-                del comment["author_id"]
-        
-        # Преобразование _id в строку
-        comment["id"] = str(comment["_id"])
-        del comment["_id"]
-        
-        return comment
+        pipeline = [{"$match": {"_id": ObjectId(comment_id)}}, *AUTHOR_LOOKUP_STAGES]
+        comments = await (await db.comments.aggregate(pipeline)).to_list(length=1)
+        return comments[0] if comments else None
     except Exception:
         return None
 
 
-async def get_comments_by_post(
-    db: AsyncIOMotorDatabase,
-    post_id: str,
-    limit: int = 50,
-    offset: int = 0,
-    include_replies: bool = False
-) -> List[Dict[str, Any]]:
-    """Получение комментариев к посту с пагинацией."""
-    # Подготовка запроса
-    query = {"post_id": post_id}
+def _comments_by_post_query(post_id: str, include_replies: bool) -> Dict[str, Any]:
+    """Фильтр комментариев к посту."""
+    query = {"post_id": ObjectId(post_id)}
     
     # Если не включаем ответы, показываем только корневые комментарии
     if not include_replies:
         query["parent_id"] = None
     
-    # Выполнение запроса
-    cursor = db.comments.find(query).sort("created_at", -1).skip(offset).limit(limit)
-    
-    comments = []
-    async for comment in cursor:
-        # Получаем полные данные о комментарии, включая автора
-        full_comment = await get_comment_by_id(db, str(comment["_id"]))
-        if full_comment:
-            # Если это корневой комментарий и мы включаем ответы, добавляем их
-            if include_replies and not comment.get("parent_id"):
-                full_comment["replies"] = await get_comment_replies(db, str(comment["_id"]))
-            
-            comments.append(full_comment)
+    return query
+
+
+async def _pending_deletion_stages(db: AsyncDatabase, post_id: Union[str, ObjectId]) -> List[Dict[str, Any]]:
+    """Стадии, исключающие ответы из деревьев, корень которых удален, а ответы еще нет."""
+    pending = await db.comment_deletions.distinct("_id", {"post_id": ObjectId(post_id)})
+    if not pending:
+        return []
     
-    return comments
+    return [
+        _ancestors_lookup("ancestors"),
+        {"$match": {"parent_id": {"$nin": pending}, "ancestors.parent_id": {"$nin": pending}}},
+        {"$project": {"ancestors": 0}}
+    ]
+
+
+async def _attach_replies(db: AsyncDatabase, comments: List[Dict[str, Any]]) -> None:
+    """Добавление деревьев ответов к корневым комментариям страницы."""
+    roots = [comment for comment in comments if not comment.get("parent_id")]
+    if roots:
+        trees = await _get_reply_trees(db, [ObjectId(comment["id"]) for comment in roots])
+        for comment in roots:
+            comment["replies"] = trees.get(comment["id"], [])
 
 
-async def get_comment_replies(
-    db: AsyncIOMotorDatabase,
-    parent_id: str
-) -> List[Dict[str, Any]]:
-    """Рекурсивное получение ответов на комментарий."""
-    # Получение прямых ответов на комментарий
-    cursor = db.comments.find({"parent_id": parent_id}).sort("created_at", 1)
+async def get_post_comments_page(
+    db: AsyncDatabase,
+    post_id: Union[str, ObjectId],
+    limit: int = 50,
+    offset: int = 0,
+    include_replies: bool = False
+) -> Dict[str, Any]:
+    """Страница комментариев к посту и их общее количество по тому же фильтру за один запрос."""
+    # Без include_replies выбираются только корневые комментарии, и ответы из
+    # удаляемых деревьев в выборку не попадают
+    filter_stages = await _pending_deletion_stages(db, post_id) if include_replies else []
+    
+    page = await aggregate_page(
+        db.comments,
+        _comments_by_post_query(post_id, include_replies),
+        {"created_at": -1},
+        limit,
+        offset,
+        AUTHOR_LOOKUP_STAGES,
+        filter_stages
+    )
     
-    replies = []
-    async for comment in cursor:
-        # Получаем полные данные о комментарии, включая автора
-        full_comment = await get_comment_by_id(db, str(comment["_id"]))
-        if full_comment:
-            # Рекурсивно получаем ответы на этот комментарий
-            full_comment["replies"] = await get_comment_replies(db, str(comment["_id"]))
-            replies.append(full_comment)
+    if include_replies:
+        await _attach_replies(db, page["items"])
     
-    return replies
+    return page
 
 
-async def get_comments_count_by_post(db: AsyncIOMotorDatabase, post_id: str) -> int:
-    """Получение общего количества комментариев к посту."""
-    return await db.comments.count_documents({"post_id": post_id})
+async def get_comment_with_replies(db: AsyncDatabase, comment_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+    """Получение комментария вместе со всем деревом ответов за один запрос."""
+    if not ObjectId.is_valid(comment_id):
+        return None
+    
+    # Комментарий и его ответы разворачиваются в один поток, чтобы подставить авторов одной стадией
+    pipeline = [
+        {"$match": {"_id": ObjectId(comment_id)}},
+        {"$addFields": {"root": "$$ROOT"}},
+        _descendants_lookup("descendants"),
+        {"$project": {"nodes": {"$concatArrays": [["$root"], "$descendants"]}}},
+        {"$unwind": "$nodes"},
+        {"$replaceRoot": {"newRoot": "$nodes"}},
+        {"$sort": {"created_at": 1}},
+        *AUTHOR_LOOKUP_STAGES
+    ]
+    comments = await (await db.comments.aggregate(pipeline)).to_list(length=None)
+    
+    _group_replies(comments)
+    return next((comment for comment in comments if comment["id"] == str(comment_id)), None)
+
+
+async def get_comment_lineage_ids(
+    db: AsyncDatabase,
+    comment_id: Union[str, ObjectId],
+    include_descendants: bool = False
+) -> List[str]:
+    """Получение ID комментария, всех его предков и (опционально) потомков."""
+    pipeline = [
+        {"$match": {"_id": ObjectId(comment_id)}},
+        _ancestors_lookup("ancestors")
+    ]
+    if include_descendants:
+        pipeline.append(_descendants_lookup("descendants"))
+    pipeline.append({"$project": {"ancestors._id": 1, "descendants._id": 1}})
+    
+    result = await (await db.comments.aggregate(pipeline)).to_list(length=1)
+    if not result:
+        return []
+    
+    related = result[0]["ancestors"] + result[0].get("descendants", [])
+    return [str(result[0]["_id"])] + [str(comment["_id"]) for comment in related]
+
+
+async def get_comment_ids_by_post(db: AsyncDatabase, post_id: Union[str, ObjectId]) -> List[str]:
+    """Получение ID всех комментариев к посту."""
+    return [str(comment_id) for comment_id in await db.comments.distinct("_id", {"post_id": ObjectId(post_id)})]
+
+
+async def _find_reply_parent(
+    db: AsyncDatabase,
+    parent_id: ObjectId,
+    post_id: ObjectId
+) -> Optional[Dict[str, Any]]:
+    """Родительский комментарий нового ответа с признаком удаления одного из его предков."""
+    pipeline = [
+        # Убеждаемся, что родительский комментарий относится к тому же посту
+        {"$match": {"_id": parent_id, "post_id": post_id}},
+        _ancestors_lookup("ancestors"),
+        # Удаленный корень уже отсутствует в коллекции, но остается parent_id верхнего из предков
+        {"$project": {"chain": {"$concatArrays": [["$parent_id"], "$ancestors.parent_id"]}}},
+        {"$lookup": {
+            "from": "comment_deletions",
+            "localField": "chain",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"_id": 1}}],
+            "as": "deletions"
+        }},
+        {"$project": {"deleting": {"$gt": [{"$size": "$deletions"}, 0]}}}
+    ]
+    result = await (await db.comments.aggregate(pipeline)).to_list(length=1)
+    return result[0] if result else None
 
 
 async def create_comment(
-    db: AsyncIOMotorDatabase,
+    db: AsyncDatabase,
     comment_data: CommentCreate,
     author_id: str
 ) -> Dict[str, Any]:
     """Создание нового комментария."""
-    # Проверка существования поста
-    post = await db.posts.find_one({"_id": ObjectId(comment_data.post_id)})
+    post_id = ObjectId(comment_data.post_id)
+    parent_id = ObjectId(comment_data.parent_id) if comment_data.parent_id else None
+    
+    # Проверки существования поста и родительского комментария выполняются параллельно
+    post_check = db.posts.find_one({"_id": post_id}, projection={"_id": 1})
+    if parent_id:
+        post, parent_comment = await asyncio.gather(
+            post_check,
+            _find_reply_parent(db, parent_id, post_id)
+        )
+    else:
+        post, parent_comment = await post_check, None
+    
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
     
-    # Если указан родительский комментарий, проверяем его существование
-    if comment_data.parent_id:
-        parent_comment = await db.comments.find_one({
-            "_id": ObjectId(comment_data.parent_id),
-            "post_id": comment_data.post_id  # Убеждаемся, что родительский комментарий относится к тому же посту
-        })
-        if not parent_comment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Parent comment not found or belongs to different post"
-            )
+    # Ответ в дерево, корень которого уже удален, не создается: он остался бы без родителя
+    if parent_id and (not parent_comment or parent_comment["deleting"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Parent comment not found or belongs to different post"
+        )
     
     # Подготовка данных
     comment_dict = comment_data.model_dump()
     now = datetime.utcnow()
     
-    # Добавление служебных полей
-    comment_dict["author_id"] = author_id
+    # Добавление служебных полей; ссылки на другие документы хранятся как ObjectId
+    comment_dict["post_id"] = post_id
+    comment_dict["parent_id"] = parent_id
+    comment_dict["author_id"] = ObjectId(author_id)
     comment_dict["created_at"] = now
     comment_dict["updated_at"] = now
     
     # Вставка в базу данных
     result = await db.comments.insert_one(comment_dict)
     
+    # Обновление счетчиков комментариев поста и автора
+    await asyncio.gather(
+        db.posts.update_one(
+            {"_id": comment_dict["post_id"]},
+            {"$inc": {"comments_count": 1}}
+        ),
+        increment_user_counters(db, "comments_count", {comment_dict["author_id"]: 1})
+    )
+    evict("post", comment_dict["post_id"])
+    
     # Получение созданного комментария
     return await get_comment_by_id(db, str(result.inserted_id))
 
 
 async def update_comment(
-    db: AsyncIOMotorDatabase,
-    comment_id: str,
+    db: AsyncDatabase,
+    comment_id: Union[str, ObjectId],
     comment_data: CommentUpdate,
-    author_id: str
+    author_id: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
     """Обновление комментария."""
-    # Проверка существования комментария
-    comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
-    if not comment:
+    if not ObjectId.is_valid(comment_id):
         return None
     
-    # Проверка прав доступа
-    if comment.get("author_id") != author_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You do not have permission to update this comment"
-        )
+    comment_oid = ObjectId(comment_id)
     
     # Подготовка данных для обновления
     update_data = {k: v for k, v in comment_data.model_dump(exclude_unset=True).items() if v is not None}
@@ -169,87 +337,212 @@ async def update_comment(
     # Добавление времени обновления
     update_data["updated_at"] = datetime.utcnow()
     
-    # Выполнение обновления
-    await db.comments.update_one(
-        {"_id": ObjectId(comment_id)},
-        {"$set": update_data}
+    # Обновление с проверкой прав (если передан ID автора) в фильтре самого запроса
+    updated_comment = await db.comments.find_one_and_update(
+        owned_filter(comment_oid, author_id),
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
+    if not updated_comment:
+        # Комментарий не подошел под фильтр: 403, если он существует, иначе 404
+        await raise_if_forbidden(db.comments, comment_oid, "You do not have permission to update this comment")
+        return None
     
-    # Получение обновленного комментария
-    return await get_comment_by_id(db, comment_id)
+    evict("comment", comment_id)
+    return await populate_comment(db, updated_comment)
 
 
-async def delete_comment(
-    db: AsyncIOMotorDatabase,
-    comment_id: str,
+async def delete_comments_by_author(
+    db: AsyncDatabase,
+    query: Dict[str, Any],
+    author_ids: Iterable[ObjectId],
+    session: Optional[AsyncClientSession] = None
+) -> Counter:
+    """Удаление комментариев по фильтру отдельным запросом на каждого автора.
+
+    Возвращает число комментариев, удаленных именно этим вызовом, по авторам. Если те же
+    комментарии параллельно удаляет другой каскад или удаление поста, каждый из них
+    спишет со счетчиков только свои удаления.
+    """
+    deleted = Counter()
+    for author_id in set(author_ids):
+        result = await db.comments.delete_many({**query, "author_id": author_id}, session=session)
+        if result.deleted_count:
+            deleted[author_id] = result.deleted_count
+    return deleted
+
+
+async def _delete_root(
+    db: AsyncDatabase,
+    query: Dict[str, Any],
+    session: Optional[AsyncClientSession] = None
+) -> Optional[Tuple[Dict[str, Any], List[ObjectId]]]:
+    """Удаление одного комментария и уменьшение счетчиков поста и автора на единицу."""
+    comment = await db.comments.find_one_and_delete(
+        query,
+        projection={"post_id": 1, "author_id": 1},
+        session=session
+    )
+    if not comment:
+        return None
+    
+    await db.posts.update_one(
+        {"_id": comment["post_id"]},
+        {"$inc": {"comments_count": -1}},
+        session=session
+    )
+    updated_users = await increment_user_counters(
+        db, "comments_count", {comment["author_id"]: -1}, session=session
+    )
+    return comment, updated_users
+
+
+async def delete_one_comment(
+    db: AsyncDatabase,
+    comment_id: Union[str, ObjectId],
     author_id: Optional[str] = None,
     is_admin: bool = False
-) -> bool:
-    """Удаление комментария и всех ответов на него."""
-    try:
-        # Проверка существования комментария
-        comment = await db.comments.find_one({"_id": ObjectId(comment_id)})
+) -> Optional[Dict[str, Any]]:
+    """Удаление самого комментария без ответов; возвращает удаленный документ."""
+    comment_oid = ObjectId(comment_id)
+    
+    # Проверка прав (если пользователь не админ) выполняется в фильтре запроса
+    query = owned_filter(comment_oid, None if is_admin else author_id)
+    
+    async with transaction(db) as session:
+        comment = await db.comments.find_one(query, projection={"post_id": 1}, session=session)
         if not comment:
-            return False
+            await raise_if_forbidden(db.comments, comment_oid, "You do not have permission to delete this comment")
+            return None
         
-        # Проверка прав доступа (если пользователь не админ)
-        if not is_admin and author_id and comment.get("author_id") != author_id:
+        # Запись о каскаде создается до удаления корня: и без транзакций сбой на любом
+        # следующем шаге оставляет ее для resume_comment_deletions
+        try:
+            await db.comment_deletions.insert_one(
+                {"_id": comment_oid, "post_id": comment["post_id"], "claimed_at": utc_now()},
+                session=session
+            )
+        except DuplicateKeyError:
+            # Комментарий уже удаляется другим запросом; исключение также отменяет транзакцию
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have permission to delete this comment"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Comment with ID {comment_id} not found"
             )
         
-        # Рекурсивное удаление всех ответов
-        await delete_comment_replies(db, comment_id)
+        deleted = await _delete_root(db, query, session)
+        if deleted is None:
+            # Комментарий удален параллельно между чтением и удалением
+            await db.comment_deletions.delete_one({"_id": comment_oid}, session=session)
+            return None
+        comment, updated_users = deleted
+    
+    # Кэш сбрасывается после фиксации транзакции
+    evict("comment", comment_oid)
+    evict("post", comment["post_id"])
+    evict("user", *updated_users)
+    return comment
+
+
+async def delete_descendants(db: AsyncDatabase, comment: Dict[str, Any]) -> int:
+    """Удаление всех ответов на уже удаленный комментарий и обновление счетчиков.
+
+    Выборка повторяется, пока ответы находятся: ответ, добавленный во время удаления,
+    тоже будет удален. Запись в comment_deletions снимается в той же транзакции,
+    в которой ответов больше не нашлось.
+    """
+    deleted_count = 0
+    while True:
+        # Продление аренды: пока каскад идет, resume_comment_deletions его не перехватит
+        await db.comment_deletions.update_one({"_id": comment["_id"]}, {"$set": {"claimed_at": utc_now()}})
         
-        # Удаление самого комментария
-        result = await db.comments.delete_one({"_id": ObjectId(comment_id)})
-        return result.deleted_count > 0
-    except Exception:
-        return False
+        async with transaction(db) as session:
+            # Идентификаторы всех ответов собираются на стороне сервера от прямых ответов
+            pipeline = [
+                {"$match": {"parent_id": comment["_id"]}},
+                _descendants_lookup("descendants"),
+                {"$project": {"author_id": 1, "descendants._id": 1, "descendants.author_id": 1}}
+            ]
+            children = await (await db.comments.aggregate(pipeline, session=session)).to_list(length=None)
+            replies = children + [reply for child in children for reply in child["descendants"]]
+            if not replies:
+                await db.comment_deletions.delete_one({"_id": comment["_id"]}, session=session)
+                return deleted_count
+            
+            reply_ids = [reply["_id"] for reply in replies]
+            authors = await delete_comments_by_author(
+                db,
+                {"_id": {"$in": reply_ids}},
+                (reply["author_id"] for reply in replies),
+                session=session
+            )
+            
+            # Счетчики поста и авторов уменьшаются только на ответы, удаленные этим вызовом
+            removed = sum(authors.values())
+            if removed:
+                await db.posts.update_one(
+                    {"_id": comment["post_id"]},
+                    {"$inc": {"comments_count": -removed}},
+                    session=session
+                )
+            updated_users = await increment_user_counters(
+                db,
+                "comments_count",
+                {author_id: -count for author_id, count in authors.items()},
+                session=session
+            )
+        
+        evict("comment", *reply_ids)
+        evict("post", comment["post_id"])
+        evict("user", *updated_users)
+        deleted_count += removed
+
 
+async def resume_comment_deletions(
+    db: AsyncDatabase,
+    stale_after: timedelta = COMMENT_DELETION_LEASE
+) -> int:
+    """Завершение каскадных удалений, брошенных упавшей задачей или остановленным процессом.
 
-async def delete_comment_replies(db: AsyncIOMotorDatabase, parent_id: str) -> None:
-    """Рекурсивное удаление всех ответов на комментарий."""
-    # Получение идентификаторов всех прямых ответов
-    cursor = db.comments.find({"parent_id": parent_id})
+    Запись старше stale_after захватывается атомарной сменой claimed_at, поэтому
+    несколько процессов не удаляют одно дерево одновременно. Если процесс упал до
+    удаления самого корня, корень удаляется здесь же. Без транзакций сбой между
+    удалением и обновлением счетчиков не восстанавливается; счетчики пересчитывает
+    scripts/init_db.py.
+    """
+    stale = await db.comment_deletions.find(
+        {"claimed_at": {"$lt": utc_now() - stale_after}}
+    ).to_list(length=None)
     
-    # Для каждого ответа рекурсивно удаляем его ответы
-    async for comment in cursor:
-        comment_id = str(comment["_id"])
-        await delete_comment_replies(db, comment_id)
+    resumed = 0
+    for deletion in stale:
+        claimed = await db.comment_deletions.find_one_and_update(
+            {"_id": deletion["_id"], "claimed_at": deletion["claimed_at"]},
+            {"$set": {"claimed_at": utc_now()}}
+        )
+        if not claimed:
+            continue
         
-        # Удаление самого ответа
-        await db.comments.delete_one({"_id": ObjectId(comment_id)})
+        if await _delete_root(db, {"_id": claimed["_id"]}) is not None:
+            evict("comment", claimed["_id"])
+        await delete_descendants(db, claimed)
+        evict("post", claimed["post_id"])
+        resumed += 1
+    
+    return resumed
 
 
-async def get_user_comments(
-    db: AsyncIOMotorDatabase,
+async def get_user_comments_page(
+    db: AsyncDatabase,
     user_id: str,
     limit: int = 20,
     offset: int = 0
-) -> List[Dict[str, Any]]:
-    """Получение комментариев пользователя с пагинацией."""
-    # Выполнение запроса
-    cursor = db.comments.find({"author_id": user_id}).sort("created_at", -1).skip(offset).limit(limit)
-    
-    comments = []
-    async for comment in cursor:
-        # Получаем полные данные о комментарии
-        full_comment = await get_comment_by_id(db, str(comment["_id"]))
-        if full_comment:
-            # Добавляем информацию о посте
-            post_id = full_comment.get("post_id")
-            if post_id:
-                post = await db.posts.find_one({"_id": ObjectId(post_id)})
-                if post:
-                    full_comment["post_title"] = post.get("title")
-            
-            comments.append(full_comment)
-    
-    return comments
-
-
-async def get_user_comments_count(db: AsyncIOMotorDatabase, user_id: str) -> int:
-    """Получение общего количества комментариев пользователя."""
-    return await db.comments.count_documents({"author_id": user_id}) 
\ No newline at end of file
+) -> Dict[str, Any]:
+    """Страница комментариев пользователя и их общее количество за один запрос."""
+    return await aggregate_page(
+        db.comments,
+        {"author_id": ObjectId(user_id)},
+        {"created_at": -1},
+        limit,
+        offset,
+        USER_COMMENT_STAGES
+    )
\ No newline at end of file
@@ -0,0 +1,61 @@
+from copy import deepcopy
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+from bson import ObjectId
+from cachetools import TTLCache
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Кэш документов в памяти процесса: ключ (сущность, ID), ограничен по размеру и времени жизни
+_entity_cache = TTLCache(maxsize=settings.ENTITY_CACHE_MAXSIZE, ttl=settings.ENTITY_CACHE_TTL_SECONDS)
+
+
+def entity_cached(entity: str) -> Callable:
+    """Кэширование результата функции вида fn(db, entity_id) по ключу (entity, entity_id).
+
+    Отсутствующие документы не кэшируются. Наружу отдается копия,
+    чтобы изменения документа в обработчике не попадали в кэш.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(db, entity_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+            key = (entity, str(entity_id))
+            document = _entity_cache.get(key)
+            if document is not None:
+                return deepcopy(document)
+
+            document = await func(db, entity_id)
+            if document is not None:
+                _entity_cache[key] = deepcopy(document)
+            return document
+
+        return wrapper
+
+    return decorator
+
+
+def get_cached(entity: str, key: Hashable) -> Any:
+    return _entity_cache.get((entity, key))
+
+
+def set_cached(entity: str, key: Hashable, value: Any) -> None:
+    _entity_cache[(entity, key)] = value
+
+
+def evict(entity: str, *keys: Hashable) -> None:
+    """Удаление документов из кэша после изменения."""
+    for key in keys:
+        _entity_cache.pop((entity, str(key)), None)
+
+
+def evict_matching(entity: str, predicate: Callable[[Dict[str, Any]], bool]) -> None:
+    """Удаление всех закэшированных документов сущности, подходящих под условие."""
+    stale = [
+        key for key, document in list(_entity_cache.items())
+        if key[0] == entity and isinstance(document, dict) and predicate(document)
+    ]
+    for key in stale:
+        _entity_cache.pop(key, None)
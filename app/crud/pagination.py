@@ -0,0 +1,37 @@
+from typing import Any, Dict, Sequence
+
+from pymongo.asynchronous.collection import AsyncCollection
+
+
+async def aggregate_page(
+    collection: AsyncCollection,
+    match: Dict[str, Any],
+    sort: Dict[str, int],
+    limit: int,
+    offset: int,
+    item_stages: Sequence[Dict[str, Any]] = (),
+    filter_stages: Sequence[Dict[str, Any]] = ()
+) -> Dict[str, Any]:
+    """Страница документов и их общее количество по фильтру за один запрос через $facet.
+
+    filter_stages дополнительно отсеивают документы и учитываются как в странице, так и в total.
+    """
+    # Сортировка до $facet, чтобы $match и $sort обслуживались одним индексом;
+    # дополнительные фильтры идут после нее и сохраняют порядок
+    pipeline = [
+        {"$match": match},
+        {"$sort": sort},
+        *filter_stages,
+        {"$facet": {
+            # Стадии документа (авторы, поля ответа) выполняются только для страницы
+            "items": [{"$skip": offset}, {"$limit": limit}, *item_stages],
+            "total": [{"$count": "count"}]
+        }}
+    ]
+    result = await (await collection.aggregate(pipeline)).to_list(length=1)
+
+    page = result[0]
+    return {
+        "items": page["items"],
+        "total": page["total"][0]["count"] if page["total"] else 0
+    }
@@ -1,73 +1,97 @@
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Union
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.asynchronous.database import AsyncDatabase
 from fastapi import HTTPException, status
 
-from app.core.utils import generate_slug, is_valid_slug, get_summary_from_content
+from app.crud.access import owned_filter, raise_if_forbidden
+from app.crud.comment import delete_comments_by_author
+from app.crud.entity_cache import entity_cached, evict, evict_matching, get_cached, set_cached
+from app.crud.pagination import aggregate_page
+from app.crud.serialize import AUTHOR_PROJECTION, serialize_post
+from app.crud.user import increment_user_counters
+from app.core.utils import generate_slug, is_valid_slug, get_summary_from_content, utc_now
+from app.db.mongodb import transaction
 from app.models.post import PostCreate, PostUpdate, PostStatus
 
+# Поля поста, которые отдаются в списках (модель Post)
+POST_LIST_PROJECTION = {
+    field: 1 for field in (
+        "title", "content", "summary", "tags", "slug", "status",
+        "author_id", "created_at", "updated_at", "comments_count"
+    )
+}
+
+# Стадии агрегации, подтягивающие автора к каждому посту списка
+POST_AUTHOR_LOOKUP_STAGES: List[Dict[str, Any]] = [
+    {"$lookup": {
+        "from": "users",
+        "localField": "author_id",
+        "foreignField": "_id",
+        "pipeline": [{"$project": AUTHOR_PROJECTION}],
+        "as": "author"
+    }}
+]
+
+
+async def populate_post(db: AsyncDatabase, post: Dict[str, Any]) -> Dict[str, Any]:
+    """Подготовка документа поста к выдаче: автор вместо author_id и строковый ID."""
+    author = None
+    if post.get("author_id"):
+        # Запрашиваем только поля публичного профиля
+        author = await db.users.find_one({"_id": post["author_id"]}, projection=AUTHOR_PROJECTION)
+    
+    return serialize_post(post, author)
 
-async def get_post_by_id(db: AsyncIOMotorDatabase, post_id: str) -> Optional[Dict[str, Any]]:
+
+def serialize_post_with_author(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Подготовка поста, загруженного вместе с автором через POST_AUTHOR_LOOKUP_STAGES."""
+    authors = post.pop("author", None)
+    return serialize_post(post, authors[0] if authors else None)
+
+
+@entity_cached("post")
+async def get_post_by_id(db: AsyncDatabase, post_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
     """Получение поста по ID с информацией об авторе."""
     try:
         post = await db.posts.find_one({"_id": ObjectId(post_id)})
         if not post:
             return None
         
-        # Получение информации об авторе
-        author_id = post.get("author_id")
-        if author_id:
-            author = await db.users.find_one({"_id": ObjectId(author_id)})
-            if author:
-                # Преобразуем _id автора в строку и удаляем пароль
-                author["id"] = str(author["_id"])
-                del author["_id"]
-                if "password" in author:
-                    del author["password"]
-                
-                # Оставляем только нужные поля для публичного профиля
-                post["author"] = {
-                    "id": author["id"],
-                    "username": author.get("username"),
-                    "full_name": author.get("full_name"),
-                    "bio": author.get("bio")
-                }
-                
-                # Удаляем идентификатор автора, так как теперь у нас есть полные данные
-                del post["author_id"]
-        
-        # Получение количества комментариев
-        comments_count = await db.comments.count_documents({"post_id": str(post["_id"])})
-        post["comments_count"] = comments_count
-        
-        # Преобразование _id в строку
-        post["id"] = str(post["_id"])
-        del post["_id"]
-        
-        return post
+        return await populate_post(db, post)
     except Exception:
         return None
 
 
-async def get_post_by_slug(db: AsyncIOMotorDatabase, slug: str) -> Optional[Dict[str, Any]]:
+async def post_exists(db: AsyncDatabase, post_id: Union[str, ObjectId]) -> bool:
+    """Проверка существования поста без загрузки документа."""
+    if not ObjectId.is_valid(post_id):
+        return False
+    
+    return await db.posts.find_one({"_id": ObjectId(post_id)}, projection={"_id": 1}) is not None
+
+
+async def get_post_by_slug(db: AsyncDatabase, slug: str) -> Optional[Dict[str, Any]]:
     """Получение поста по URL-slug."""
+    # Кэш хранит соответствие slug -> ID, сам пост берется из кэша по ID
+    post_id = get_cached("post_slug", slug)
+    if post_id is not None:
+        post = await get_post_by_id(db, post_id)
+        # Пост мог быть удален или сменить slug — тогда ищем заново
+        if post and post.get("slug") == slug:
+            return post
+    
     post = await db.posts.find_one({"slug": slug})
     if not post:
         return None
     
-    # Получаем полные данные поста с автором
-    return await get_post_by_id(db, str(post["_id"]))
+    # Добавляем данные автора к уже загруженному документу
+    post = await populate_post(db, post)
+    set_cached("post_slug", slug, post["id"])
+    return post
 
 
-async def get_posts(
-    db: AsyncIOMotorDatabase,
-    limit: int = 10,
-    offset: int = 0,
-    filters: Dict = None
-) -> List[Dict[str, Any]]:
-    """Получение списка постов с пагинацией и фильтрацией."""
-    # Подготовка фильтра
+def build_posts_query(filters: Dict = None) -> Dict[str, Any]:
+    """Подготовка запроса к коллекции постов по фильтрам."""
     query = {}
     if filters:
         if "status" in filters:
@@ -77,55 +101,93 @@ async def get_posts(
             query["tags"] = filters["tags"]
         
         if "author_id" in filters:
-            query["author_id"] = filters["author_id"]
+            if not ObjectId.is_valid(filters["author_id"]):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid author ID"
+                )
+            query["author_id"] = ObjectId(filters["author_id"])
     
     # По умолчанию показываем только опубликованные посты
     if "status" not in query:
         query["status"] = PostStatus.PUBLISHED
     
-    # Выполнение запроса с сортировкой по дате создания (сначала новые)
-    cursor = db.posts.find(query).sort("created_at", -1).skip(offset).limit(limit)
+    return query
+
+
+async def get_posts_page(
+    db: AsyncDatabase,
+    limit: int = 10,
+    offset: int = 0,
+    filters: Dict = None
+) -> Dict[str, Any]:
+    """Страница постов и общее количество по фильтрам за один запрос."""
+    page = await aggregate_page(
+        db.posts,
+        build_posts_query(filters),
+        {"created_at": -1},
+        limit,
+        offset,
+        [{"$project": POST_LIST_PROJECTION}, *POST_AUTHOR_LOOKUP_STAGES]
+    )
+    page["items"] = [serialize_post_with_author(post) for post in page["items"]]
+    
+    return page
+
+
+def iter_posts(
+    db: AsyncDatabase,
+    limit: int = 10,
+    offset: int = 0,
+    filters: Dict = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Посты страницы по одному по мере чтения курсора, без загрузки всей страницы.
+
+    Фильтры проверяются сразу, до начала потоковой отдачи ответа.
+    """
+    pipeline = [
+        {"$match": build_posts_query(filters)},
+        {"$sort": {"created_at": -1}},
+        {"$skip": offset},
+        {"$limit": limit},
+        {"$project": POST_LIST_PROJECTION},
+        *POST_AUTHOR_LOOKUP_STAGES
+    ]
     
-    posts = []
-    async for post in cursor:
-        # Получаем полные данные о посте, включая автора и счетчик комментариев
-        full_post = await get_post_by_id(db, str(post["_id"]))
-        if full_post:
-            posts.append(full_post)
+    async def posts() -> AsyncIterator[Dict[str, Any]]:
+        async with await db.posts.aggregate(pipeline) as cursor:
+            async for post in cursor:
+                yield serialize_post_with_author(post)
     
-    return posts
+    return posts()
+
 
+def posts_count_hint(query: Dict[str, Any]) -> List[tuple]:
+    """Индекс для подсчета постов: самый избирательный из покрывающих фильтр."""
+    if "author_id" in query:
+        return [("author_id", 1), ("created_at", -1)]
+    if "tags" in query:
+        return [("tags", 1)]
+    return [("status", 1), ("created_at", -1)]
 
-async def get_posts_count(db: AsyncIOMotorDatabase, filters: Dict = None) -> int:
+
+async def get_posts_count(db: AsyncDatabase, filters: Dict = None) -> int:
     """Получение общего количества постов с учетом фильтров."""
-    # Подготовка фильтра
-    query = {}
-    if filters:
-        if "status" in filters:
-            query["status"] = filters["status"]
-        
-        if "tags" in filters:
-            query["tags"] = filters["tags"]
-        
-        if "author_id" in filters:
-            query["author_id"] = filters["author_id"]
-    
-    # По умолчанию показываем только опубликованные посты
-    if "status" not in query:
-        query["status"] = PostStatus.PUBLISHED
+    query = build_posts_query(filters)
     
-    return await db.posts.count_documents(query)
+    # Фильтр по статусу есть всегда, поэтому подсчет идет по индексу без выбора плана
+    return await db.posts.count_documents(query, hint=posts_count_hint(query))
 
 
 async def create_post(
-    db: AsyncIOMotorDatabase,
+    db: AsyncDatabase,
     post_data: PostCreate,
     author_id: str
 ) -> Dict[str, Any]:
     """Создание нового поста."""
     # Подготовка данных
     post_dict = post_data.model_dump()
-    now = datetime.utcnow()
+    now = utc_now()
     
     # Генерация slug, если он не указан
     if not post_dict.get("slug"):
@@ -137,7 +199,7 @@ async def create_post(
         )
     
     # Проверка уникальности slug
-    existing_post = await db.posts.find_one({"slug": post_dict["slug"]})
+    existing_post = await db.posts.find_one({"slug": post_dict["slug"]}, projection={"_id": 1})
     if existing_post:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -149,35 +211,35 @@ async def create_post(
         post_dict["summary"] = get_summary_from_content(post_dict["content"])
     
     # Добавление служебных полей
-    post_dict["author_id"] = author_id
+    post_dict["author_id"] = ObjectId(author_id)
+    post_dict["comments_count"] = 0
     post_dict["created_at"] = now
     post_dict["updated_at"] = now
     
     # Вставка в базу данных
-    result = await db.posts.insert_one(post_dict)
+    await db.posts.insert_one(post_dict)
     
-    # Получение созданного поста
-    return await get_post_by_id(db, str(result.inserted_id))
+    # У автора учитываются только опубликованные посты
+    if post_dict["status"] == PostStatus.PUBLISHED:
+        await increment_user_counters(db, "posts_count", {post_dict["author_id"]: 1})
+    
+    # Ответ собирается из вставленного документа (insert_one добавил в него _id) без повторного чтения поста
+    return await populate_post(db, post_dict)
 
 
 async def update_post(
-    db: AsyncIOMotorDatabase,
-    post_id: str,
+    db: AsyncDatabase,
+    post_id: Union[str, ObjectId],
     post_data: PostUpdate,
     author_id: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
     """Обновление поста."""
-    # Проверка существования поста
-    post = await db.posts.find_one({"_id": ObjectId(post_id)})
-    if not post:
+    if not ObjectId.is_valid(post_id):
         return None
     
-    # Проверка прав доступа (если передан ID автора)
-    if author_id and post.get("author_id") != author_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You do not have permission to update this post"
-        )
+    # Проверка прав (если передан ID автора) выполняется в фильтре самого обновления
+    post_oid = ObjectId(post_id)
+    query = owned_filter(post_oid, author_id)
     
     # Подготовка данных для обновления
     update_data = {k: v for k, v in post_data.model_dump(exclude_unset=True).items() if v is not None}
@@ -185,7 +247,15 @@ async def update_post(
     # Обработка slug, если он изменяется
     if "slug" in update_data:
         if not update_data["slug"]:
-            update_data["slug"] = generate_slug(update_data.get("title") or post.get("title"))
+            title = update_data.get("title")
+            if not title:
+                # Заголовок нужен только для генерации slug, поэтому загружается лишь в этом случае
+                post = await db.posts.find_one(query, projection={"title": 1})
+                if not post:
+                    await raise_if_forbidden(db.posts, post_oid, "You do not have permission to update this post")
+                    return None
+                title = post["title"]
+            update_data["slug"] = generate_slug(title)
         elif not is_valid_slug(update_data["slug"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -193,55 +263,99 @@ async def update_post(
             )
         
         # Проверка уникальности нового slug
-        if update_data["slug"] != post.get("slug"):
-            existing_post = await db.posts.find_one({"slug": update_data["slug"]})
-            if existing_post:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Post with this slug already exists"
-                )
+        existing_post = await db.posts.find_one(
+            {"slug": update_data["slug"], "_id": {"$ne": post_oid}},
+            projection={"_id": 1}
+        )
+        if existing_post:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Post with this slug already exists"
+            )
     
     # Обработка summary, если контент изменяется
     if "content" in update_data and "summary" not in update_data:
         update_data["summary"] = get_summary_from_content(update_data["content"])
     
     # Добавление времени обновления
-    update_data["updated_at"] = datetime.utcnow()
+    update_data["updated_at"] = utc_now()
     
-    # Выполнение обновления
-    await db.posts.update_one(
-        {"_id": ObjectId(post_id)},
+    # Выполнение обновления с получением документа до изменения: прежний статус нужен для счетчика автора
+    previous_post = await db.posts.find_one_and_update(
+        query,
         {"$set": update_data}
     )
+    if not previous_post:
+        # Пост не подошел под фильтр: 403, если он существует, иначе 404
+        await raise_if_forbidden(db.posts, post_oid, "You do not have permission to update this post")
+        return None
+    
+    evict("post", post_id)
     
-    # Получение обновленного поста
-    return await get_post_by_id(db, post_id)
+    # Обновление только через $set, поэтому итоговый документ собирается без повторного чтения
+    updated_post = {**previous_post, **update_data}
+    
+    was_published = previous_post.get("status") == PostStatus.PUBLISHED
+    is_published = updated_post.get("status") == PostStatus.PUBLISHED
+    if was_published != is_published:
+        await increment_user_counters(
+            db,
+            "posts_count",
+            {previous_post["author_id"]: 1 if is_published else -1}
+        )
+    
+    return await populate_post(db, updated_post)
 
 
 async def delete_post(
-    db: AsyncIOMotorDatabase,
-    post_id: str,
+    db: AsyncDatabase,
+    post_id: Union[str, ObjectId],
     author_id: Optional[str] = None
 ) -> bool:
     """Удаление поста и всех связанных комментариев."""
     try:
-        # Проверка существования поста
-        post = await db.posts.find_one({"_id": ObjectId(post_id)})
-        if not post:
-            return False
+        post_oid = ObjectId(post_id)
         
-        # Проверка прав доступа (если передан ID автора)
-        if author_id and post.get("author_id") != author_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have permission to delete this post"
+        # Пост, счетчики и комментарии удаляются одной транзакцией: комментарий, добавленный
+        # между подсчетом и удалением, не останется без списания со счетчика автора
+        async with transaction(db) as session:
+            # Удаление поста с проверкой прав (если передан ID автора) в фильтре
+            post = await db.posts.find_one_and_delete(
+                owned_filter(post_oid, author_id),
+                projection={"author_id": 1, "status": 1},
+                session=session
             )
+            if not post:
+                await raise_if_forbidden(db.posts, post_oid, "You do not have permission to delete this post")
+                return False
+            
+            updated_users = []
+            if post.get("status") == PostStatus.PUBLISHED:
+                updated_users += await increment_user_counters(
+                    db, "posts_count", {post["author_id"]: -1}, session=session
+                )
+            
+            # Комментарии удаляются по авторам, и счетчик каждого уменьшается ровно на удаленное
+            # этим вызовом: параллельный каскад удаления ответов не спишет те же комментарии дважды.
+            # Повтор подбирает комментарии, добавленные во время удаления
+            while authors := await db.comments.distinct("author_id", {"post_id": post_oid}, session=session):
+                deleted = await delete_comments_by_author(db, {"post_id": post_oid}, authors, session=session)
+                updated_users += await increment_user_counters(
+                    db,
+                    "comments_count",
+                    {author: -count for author, count in deleted.items()},
+                    session=session
+                )
+            
+            # Незавершенные каскады по удаленному посту больше не нужны
+            await db.comment_deletions.delete_many({"post_id": post_oid}, session=session)
         
-        # Удаление всех комментариев к посту
-        await db.comments.delete_many({"post_id": post_id})
-        
-        # Удаление поста
-        result = await db.posts.delete_one({"_id": ObjectId(post_id)})
-        return result.deleted_count > 0
+        # Кэш сбрасывается после фиксации транзакции
+        evict("post", post_id)
+        evict("user", *updated_users)
+        evict_matching("comment", lambda comment: comment.get("post_id") == str(post_id))
+        return True
+    except HTTPException:
+        raise
     except Exception:
-        return False 
\ No newline at end of file
+        return False
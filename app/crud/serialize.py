@@ -0,0 +1,38 @@
+from typing import Any, Dict, Optional
+
+# Поля публичного профиля автора, которые отдаются вместе с постами и комментариями
+AUTHOR_FIELDS = ("username", "full_name", "bio")
+AUTHOR_PROJECTION = {field: 1 for field in AUTHOR_FIELDS}
+
+
+def serialize_author(author: Dict[str, Any]) -> Dict[str, Any]:
+    """Публичный профиль автора из документа пользователя."""
+    return {"id": str(author["_id"]), **{field: author.get(field) for field in AUTHOR_FIELDS}}
+
+
+def serialize_comment(comment: Dict[str, Any], author: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Преобразование документа комментария к виду ответа API (документ изменяется на месте)."""
+    comment["id"] = str(comment.pop("_id"))
+    comment["post_id"] = str(comment["post_id"])
+    if comment.get("parent_id"):
+        comment["parent_id"] = str(comment["parent_id"])
+    
+    if author is not None:
+        comment["author"] = serialize_author(author)
+        comment.pop("author_id", None)
+    
+    return comment
+
+
+def serialize_post(post: Dict[str, Any], author: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Преобразование документа поста к виду ответа API (документ изменяется на месте)."""
+    post["id"] = str(post.pop("_id"))
+    
+    # Счетчик комментариев хранится в самом посте
+    post.setdefault("comments_count", 0)
+    
+    if author is not None:
+        post["author"] = serialize_author(author)
+        post.pop("author_id", None)
+    
+    return post
@@ -1,14 +1,25 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Mapping, Union
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.database import AsyncDatabase
 from fastapi import HTTPException, status
 
-from app.core.security import verify_password, get_password_hash
+from app.crud.entity_cache import entity_cached, evict
+from app.core.security import verify_password_async, get_password_hash_async
 from app.models.user import UserCreate, UserUpdate, UserRole
 
+# Поля, нужные для входа и выпуска токена
+LOGIN_PROJECTION = {"username": 1, "email": 1, "role": 1, "password": 1}
 
-async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dict[str, Any]]:
+# Поля публичного профиля (модель UserPublic)
+PUBLIC_USER_FIELDS = ("username", "full_name", "bio", "role", "created_at")
+PUBLIC_USER_PROJECTION = {field: 1 for field in PUBLIC_USER_FIELDS}
+
+
+@entity_cached("user")
+async def get_user_by_id(db: AsyncDatabase, user_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
     try:
         user = await db.users.find_one({"_id": ObjectId(user_id)})
         if not user:
@@ -25,7 +36,43 @@ async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dic
         return None
 
 
-async def get_user_by_email(db: AsyncIOMotorDatabase, email: str) -> Optional[Dict[str, Any]]:
+async def get_user_with_stats(db: AsyncDatabase, user_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+    """Пользователь вместе с количеством его опубликованных постов и комментариев."""
+    user = await get_user_by_id(db, user_id)
+    if not user:
+        return None
+    
+    # Счетчики хранятся в документе пользователя и обновляются при изменении постов и комментариев
+    user.setdefault("posts_count", 0)
+    user.setdefault("comments_count", 0)
+    return user
+
+
+async def increment_user_counters(
+    db: AsyncDatabase,
+    counter: str,
+    deltas: Mapping[ObjectId, int],
+    session: Optional[AsyncClientSession] = None
+) -> List[ObjectId]:
+    """Изменение денормализованного счетчика (posts_count, comments_count) у авторов одним запросом.
+
+    Возвращает ID измененных пользователей. Внутри транзакции (передан session) кэш
+    не сбрасывается: вызывающий код сбрасывает его после фиксации, иначе параллельное
+    чтение успеет закэшировать счетчики до коммита.
+    """
+    author_ids = [author_id for author_id, delta in deltas.items() if delta]
+    if not author_ids:
+        return []
+    
+    requests = [UpdateOne({"_id": author_id}, {"$inc": {counter: deltas[author_id]}}) for author_id in author_ids]
+    await db.users.bulk_write(requests, ordered=False, session=session)
+    
+    if session is None:
+        evict("user", *author_ids)
+    return author_ids
+
+
+async def get_user_by_email(db: AsyncDatabase, email: str) -> Optional[Dict[str, Any]]:
     user = await db.users.find_one({"email": email})
     if not user:
         return None
@@ -36,7 +83,7 @@ async def get_user_by_email(db: AsyncIOMotorDatabase, email: str) -> Optional[Di
     return user
 
 
-async def get_user_by_username(db: AsyncIOMotorDatabase, username: str) -> Optional[Dict[str, Any]]:
+async def get_user_by_username(db: AsyncDatabase, username: str) -> Optional[Dict[str, Any]]:
     user = await db.users.find_one({"username": username})
     if not user:
         return None
@@ -47,32 +94,33 @@ async def get_user_by_username(db: AsyncIOMotorDatabase, username: str) -> Optio
     return user
 
 
-async def get_users(
-    db: AsyncIOMotorDatabase, 
+async def user_exists(db: AsyncDatabase, field: str, value: Any) -> bool:
+    return await db.users.find_one({field: value}, projection={"_id": 1}) is not None
+
+
+async def iter_users(
+    db: AsyncDatabase, 
     skip: int = 0, 
     limit: int = 10,
     role: Optional[UserRole] = None
-) -> List[Dict[str, Any]]:
+) -> AsyncIterator[Dict[str, Any]]:
+    """Публичные профили пользователей по одному по мере чтения курсора."""
     query = {}
     if role:
         query["role"] = role
     
-    cursor = db.users.find(query).skip(skip).limit(limit)
-    
-    users = []
-    async for user in cursor:
-        user["id"] = str(user["_id"])
-        del user["_id"]
-        
-        if "password" in user:
-            del user["password"]
-        
-        users.append(user)
-    
-    return users
+    async with db.users.find(query, projection=PUBLIC_USER_PROJECTION).skip(skip).limit(limit) as cursor:
+        async for user in cursor:
+            user["id"] = str(user.pop("_id"))
+            
+            # Ответ отдается без модели, поэтому необязательные поля заполняются явно
+            user.setdefault("full_name", None)
+            user.setdefault("bio", None)
+            
+            yield user
 
 
-async def get_users_count(db: AsyncIOMotorDatabase, role: Optional[UserRole] = None) -> int:
+async def get_users_count(db: AsyncDatabase, role: Optional[UserRole] = None) -> int:
     query = {}
     if role:
         query["role"] = role
@@ -80,14 +128,14 @@ async def get_users_count(db: AsyncIOMotorDatabase, role: Optional[UserRole] = N
     return await db.users.count_documents(query)
 
 
-async def create_user(db: AsyncIOMotorDatabase, user_data: UserCreate) -> Dict[str, Any]:
-    if await get_user_by_email(db, user_data.email):
+async def create_user(db: AsyncDatabase, user_data: UserCreate) -> Dict[str, Any]:
+    if await user_exists(db, "email", user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    if await get_user_by_username(db, user_data.username):
+    if await user_exists(db, "username", user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -96,9 +144,11 @@ async def create_user(db: AsyncIOMotorDatabase, user_data: UserCreate) -> Dict[s
     user_dict = user_data.model_dump()
     now = datetime.utcnow()
     
-    hashed_password = get_password_hash(user_dict["password"])
+    hashed_password = await get_password_hash_async(user_dict["password"])
     user_dict["password"] = hashed_password
     user_dict["role"] = UserRole.USER
+    user_dict["posts_count"] = 0
+    user_dict["comments_count"] = 0
     user_dict["created_at"] = now
     user_dict["updated_at"] = now
     
@@ -109,8 +159,8 @@ async def create_user(db: AsyncIOMotorDatabase, user_data: UserCreate) -> Dict[s
 
 
 async def update_user(
-    db: AsyncIOMotorDatabase, 
-    user_id: str, 
+    db: AsyncDatabase, 
+    user_id: Union[str, ObjectId], 
     user_data: UserUpdate
 ) -> Optional[Dict[str, Any]]:
     user = await get_user_by_id(db, user_id)
@@ -120,14 +170,14 @@ async def update_user(
     update_data = {k: v for k, v in user_data.model_dump(exclude_unset=True).items() if v is not None}
     
     if "email" in update_data and update_data["email"] != user["email"]:
-        if await get_user_by_email(db, update_data["email"]):
+        if await user_exists(db, "email", update_data["email"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
     
     if "username" in update_data and update_data["username"] != user["username"]:
-        if await get_user_by_username(db, update_data["username"]):
+        if await user_exists(db, "username", update_data["username"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already taken"
@@ -136,57 +186,59 @@ async def update_user(
     update_data["updated_at"] = datetime.utcnow()
     
     await db.users.update_one({"_id": ObjectId(user_id)}, {"$set": update_data})
+    evict("user", user_id)
     
     return await get_user_by_id(db, user_id)
 
 
-async def delete_user(db: AsyncIOMotorDatabase, user_id: str) -> bool:
+async def delete_user(db: AsyncDatabase, user_id: Union[str, ObjectId]) -> bool:
     try:
         result = await db.users.delete_one({"_id": ObjectId(user_id)})
+        evict("user", user_id)
         return result.deleted_count > 0
     except Exception:
         return False
 
 
 async def authenticate_user(
-    db: AsyncIOMotorDatabase, 
+    db: AsyncDatabase, 
     username_or_email: str, 
     password: str
 ) -> Optional[Dict[str, Any]]:
-    user = await get_user_by_username(db, username_or_email)
+    user = await db.users.find_one({"username": username_or_email}, projection=LOGIN_PROJECTION)
     
     if not user:
-        user = await get_user_by_email(db, username_or_email)
+        user = await db.users.find_one({"email": username_or_email}, projection=LOGIN_PROJECTION)
     
     if not user:
         return None
     
-    user_with_password = await db.users.find_one({"_id": ObjectId(user["id"])})
-    
-    if not verify_password(password, user_with_password["password"]):
+    if not await verify_password_async(password, user.pop("password")):
         return None
     
+    user["id"] = str(user.pop("_id"))
     return user
 
 
 async def change_user_password(
-    db: AsyncIOMotorDatabase,
+    db: AsyncDatabase,
     user_id: str,
     current_password: str,
     new_password: str
 ) -> bool:
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, projection={"password": 1})
     if not user:
         return False
     
-    if not verify_password(current_password, user["password"]):
+    if not await verify_password_async(current_password, user["password"]):
         return False
     
-    hashed_password = get_password_hash(new_password)
+    hashed_password = await get_password_hash_async(new_password)
     
     await db.users.update_one(
         {"_id": ObjectId(user_id)},
         {"$set": {"password": hashed_password, "updated_at": datetime.utcnow()}}
     )
+    evict("user", user_id)
     
     return True 
\ No newline at end of file
@@ -1,27 +1,90 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from pymongo import AsyncMongoClient, IndexModel
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.database import AsyncDatabase
+
 from app.core.config import get_settings
 
 settings = get_settings()
 
-client = None
-db = None
+# Индексы под фильтры и сортировки запросов приложения
+POST_INDEXES = [
+    IndexModel("slug", unique=True),
+    # Фильтры списка постов
+    IndexModel([("status", 1), ("created_at", -1)]),
+    IndexModel("tags"),
+    IndexModel([("author_id", 1), ("created_at", -1)]),
+]
+
+USER_INDEXES = [
+    IndexModel("email", unique=True),
+    IndexModel("username", unique=True),
+    IndexModel("role"),
+]
+
+# Страницы по посту, дерево ответов, комментарии пользователя
+COMMENT_INDEXES = [
+    IndexModel([("post_id", 1), ("parent_id", 1), ("created_at", -1)]),
+    IndexModel([("post_id", 1), ("created_at", -1)]),
+    IndexModel([("parent_id", 1), ("created_at", 1)]),
+    IndexModel([("author_id", 1), ("created_at", -1)]),
+]
+
+# Незавершенные каскадные удаления ответов: скрытие удаляемых веток в выдаче поста
+COMMENT_DELETION_INDEXES = [
+    IndexModel("post_id"),
+]
+
 
+async def create_indexes(database: AsyncDatabase) -> None:
+    """Создание индексов: по одной команде на коллекцию, коллекции обрабатываются параллельно."""
+    await asyncio.gather(
+        database.posts.create_indexes(POST_INDEXES),
+        database.users.create_indexes(USER_INDEXES),
+        database.comments.create_indexes(COMMENT_INDEXES),
+        database.comment_deletions.create_indexes(COMMENT_DELETION_INDEXES)
+    )
 
-async def connect_to_mongo():
-    global client, db
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    db = client[settings.MONGODB_DB_NAME]
+
+async def connect_to_mongo() -> AsyncMongoClient:
+    """Создание клиента MongoDB; вызывается один раз на процесс внутри его event loop."""
+    client = AsyncMongoClient(
+        settings.MONGODB_URL,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        retryWrites=True,
+        compressors=settings.MONGODB_COMPRESSORS
+    )
+    
+    # Первый запрос устанавливает соединение, дальше пул добирает minPoolSize в фоне
+    await client.admin.command("ping")
     
-    await db.posts.create_index("slug", unique=True)
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("username", unique=True)
+    await create_indexes(client[settings.MONGODB_DB_NAME])
+    return client
+
 
+async def close_mongo_connection(client: AsyncMongoClient) -> None:
+    await client.close()
 
-async def close_mongo_connection():
-    global client
-    if client:
-        client.close()
 
+def get_database(request: Request) -> AsyncDatabase:
+    return request.app.state.db
 
-def get_database():
-    return db 
\ No newline at end of file
+
+@asynccontextmanager
+async def transaction(database: AsyncDatabase) -> AsyncIterator[Optional[AsyncClientSession]]:
+    """Сессия с транзакцией, если транзакции включены; иначе операции выполняются без сессии."""
+    if not settings.MONGODB_TRANSACTIONS:
+        yield None
+        return
+    
+    async with database.client.start_session() as session:
+        async with await session.start_transaction():
+            yield session 
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from redis.asyncio import ConnectionPool, Redis
+from app.core.config import get_settings
+
+settings = get_settings()
+
+pool = None
+client = None
+
+
+async def connect_to_redis():
+    global pool, client
+    # Кэш необязателен: без REDIS_URL приложение работает напрямую с MongoDB
+    if not settings.REDIS_URL:
+        return
+    
+    pool = ConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS
+    )
+    client = Redis(connection_pool=pool)
+
+
+async def close_redis_connection():
+    if client:
+        await client.aclose()
+    if pool:
+        await pool.disconnect()
+
+
+def get_redis() -> Optional[Redis]:
+    return client
@@ -42,5 +42,13 @@ class CommentList(BaseModel):
     items: List[Comment]
 
 
+class CommentWithRepliesList(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    # replies заполняется только при include_replies=true
+    items: List[CommentWithReplies]
+
+
 # Обновляем ссылку на себя для рекурсивной модели
 CommentWithReplies.model_rebuild() 
\ No newline at end of file
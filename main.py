@@ -1,13 +1,47 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from functools import partial
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
+from app.core.responses import ORJSONResponse
+from app.core.tasks import repeat_every, wait_background_tasks
+from app.crud.comment import COMMENT_DELETION_LEASE, resume_comment_deletions
 from app.api.api import api_router
 from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.db.redis import connect_to_redis, close_redis_connection
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Один клиент MongoDB с общим пулом соединений на процесс
+    app.state.mongo = await connect_to_mongo()
+    app.state.db = app.state.mongo[settings.MONGODB_DB_NAME]
+    await connect_to_redis()
+    # Задачи, запущенные обработчиками после ответа (каскадное удаление и т. п.)
+    app.state.background_tasks = set()
+    # Каскадные удаления ответов, брошенные упавшей задачей или другим процессом, доводятся до конца
+    deletion_sweeper = asyncio.create_task(repeat_every(
+        COMMENT_DELETION_LEASE.total_seconds(),
+        partial(resume_comment_deletions, app.state.db),
+        "resume-comment-deletions"
+    ))
+    
+    yield
+    
+    deletion_sweeper.cancel()
+    await asyncio.gather(deletion_sweeper, return_exceptions=True)
+    await wait_background_tasks(app.state.background_tasks)
+    await close_redis_connection()
+    await close_mongo_connection(app.state.mongo)
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
@@ -15,6 +49,8 @@ app = FastAPI(
     openapi_url=f"{settings.API_PREFIX}/openapi.json",
     docs_url=f"{settings.API_PREFIX}/docs",
     redoc_url=f"{settings.API_PREFIX}/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -25,10 +61,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_event_handler("startup", connect_to_mongo)
-app.add_event_handler("shutdown", close_mongo_connection)
-
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        # uvloop недоступен на Windows
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    ) 
\ No newline at end of file
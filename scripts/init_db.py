@@ -1,9 +1,13 @@
 import asyncio
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime, timedelta
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
+from app.crud.comment import resume_comment_deletions
+from app.db.mongodb import create_indexes
+from app.models.post import PostStatus
 from app.models.user import UserRole
 
 load_dotenv()
@@ -18,30 +22,82 @@ ADMIN_NAME = os.getenv("ADMIN_NAME", "Administrator")
 
 
 async def init_db():
-    client = AsyncIOMotorClient(MONGODB_URL)
+    client = AsyncMongoClient(MONGODB_URL)
     db = client[MONGODB_DB_NAME]
     
     print("Creating indexes...")
     
-    await db.posts.create_index("slug", unique=True)
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("username", unique=True)
+    # Проверка существования админа не зависит от индексов и выполняется параллельно с их созданием
+    _, existing_admin = await asyncio.gather(
+        create_indexes(db),
+        db.users.find_one({"email": ADMIN_EMAIL}, projection={"_id": 1})
+    )
+    
+    print("Migrating references to ObjectId...")
+    
+    # Ссылки на другие документы хранятся как ObjectId: $lookup и $graphLookup
+    # сравнивают значения с учетом типа, а ключи индексов получаются короче
+    references = [
+        ("comments", "parent_id"),
+        ("comments", "post_id"),
+        ("comments", "author_id"),
+        ("posts", "author_id"),
+    ]
+    for collection, field in references:
+        result = await db[collection].update_many(
+            {field: {"$type": "string"}},
+            [{"$set": {field: {"$toObjectId": f"${field}"}}}]
+        )
+        print(f"Converted {field} in {result.modified_count} {collection}")
+    
+    print("Finishing interrupted comment deletions...")
+    
+    # Счетчики ниже пересчитываются заново, поэтому незавершенные каскады запускаются все сразу
+    resumed = await resume_comment_deletions(db, stale_after=timedelta(0))
+    print(f"Finished {resumed} comment deletions")
+    
+    print("Recounting post comments...")
+    
+    # Денормализованный счетчик comments_count пересчитывается по коллекции комментариев
+    await db.posts.update_many({}, {"$set": {"comments_count": 0}})
+    cursor = await db.comments.aggregate([
+        {"$group": {"_id": "$post_id", "comments_count": {"$sum": 1}}},
+        {"$merge": {"into": "posts", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+    ])
+    await cursor.to_list(length=None)
+    
+    print("Recounting user posts and comments...")
+    
+    # Счетчики пользователя: опубликованные посты и все комментарии
+    await db.users.update_many({}, {"$set": {"posts_count": 0, "comments_count": 0}})
+    user_counters = [
+        ("posts", "posts_count", {"status": PostStatus.PUBLISHED}),
+        ("comments", "comments_count", {}),
+    ]
+    for collection, counter, query in user_counters:
+        cursor = await db[collection].aggregate([
+            {"$match": query},
+            {"$group": {"_id": "$author_id", counter: {"$sum": 1}}},
+            {"$merge": {"into": "users", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+        ])
+        await cursor.to_list(length=None)
     
     print("Creating admin user...")
     
-    # Проверка существования админа
-    existing_admin = await db.users.find_one({"email": ADMIN_EMAIL})
     if existing_admin:
         print("Admin user already exists")
     else:
+        now = datetime.now()
         admin_user = {
             "username": ADMIN_USERNAME,
             "email": ADMIN_EMAIL,
-            "password": get_password_hash(ADMIN_PASSWORD),
+            "password": await get_password_hash_async(ADMIN_PASSWORD),
             "full_name": ADMIN_NAME,
             "role": UserRole.ADMIN,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
+            "posts_count": 0,
+            "comments_count": 0,
+            "created_at": now,
+            "updated_at": now
         }
         
         result = await db.users.insert_one(admin_user)
@@ -52,9 +108,8 @@ async def init_db():
     
     print("Database initialization completed")
     
-    client.close()
+    await client.close()
 
 
 if __name__ == "__main__":
-    from datetime import datetime
     asyncio.run(init_db()) 
\ No newline at end of file